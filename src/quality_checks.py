@@ -1,32 +1,41 @@
 
+import numpy as np
 import pandas as pd
 
 def anomaly_rules(df: pd.DataFrame) -> pd.DataFrame:
-    issues = []
+    # Column presence is resolved once per frame; rules whose columns are
+    # absent are skipped, matching the old row.get() tolerance.
+    present = set(df.columns)
+    future_cutoff = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
 
-    def add_issue(row, code, detail):
-        issues.append({
-            "opportunity_id": row.get("Id"),
-            "code": code,
-            "detail": detail
-        })
+    rules = []
+    if "Amount" in present:
+        amount = pd.to_numeric(df["Amount"], errors="coerce")
+        rules.append(("NEG_AMOUNT", amount.lt(0), "Amount is negative"))
+    if "Probability" in present:
+        prob = pd.to_numeric(df["Probability"], errors="coerce")
+        rules.append(("PROB_OOB", prob.lt(0) | prob.gt(100), "Probability outside 0-100"))
+    if "CloseDate" in present:
+        rules.append(("FUTURE_CLOSE", df["CloseDate"] > future_cutoff, "CloseDate in the future"))
+    if "StageStd" in present:
+        rules.append(("MISSING_STAGE_MAP", df["StageStd"].isna(), "Stage could not be mapped to standard taxonomy"))
+    if {"CurrencyIsoCode", "fx_rate_used"} <= present:
+        currency = df["CurrencyIsoCode"].fillna("")
+        rules.append(("MISSING_FX", currency.ne("") & df["fx_rate_used"].isna(), "FX rate missing for currency/date"))
 
-    for idx, row in df.iterrows():
-        amt = row.get("Amount")
-        prob = row.get("Probability")
-        closed = row.get("CloseDate")
-        stage_std = row.get("StageStd")
-        fx = row.get("fx_rate_used")
-
-        if pd.notna(amt) and amt < 0:
-            add_issue(row, "NEG_AMOUNT", "Amount is negative")
-        if pd.notna(prob) and (prob < 0 or prob > 100):
-            add_issue(row, "PROB_OOB", "Probability outside 0-100")
-        if pd.notna(closed) and closed > pd.Timestamp.utcnow().normalize() + pd.Timedelta(days=1):
-            add_issue(row, "FUTURE_CLOSE", "CloseDate in the future")
-        if pd.isna(stage_std):
-            add_issue(row, "MISSING_STAGE_MAP", "Stage could not be mapped to standard taxonomy")
-        if row.get("CurrencyIsoCode") and pd.isna(fx):
-            add_issue(row, "MISSING_FX", "FX rate missing for currency/date")
-
-    return pd.DataFrame(issues)
+    # Assemble the output column-by-column: one array slice per firing rule,
+    # one DataFrame construction at the end.
+    ids_parts, code_parts, detail_parts = [], [], []
+    for code, mask, detail in rules:
+        ids = df.loc[mask, "Id"].to_numpy(dtype=object)
+        if len(ids):
+            ids_parts.append(ids)
+            code_parts.append(np.full(len(ids), code, dtype=object))
+            detail_parts.append(np.full(len(ids), detail, dtype=object))
+    if not ids_parts:
+        return pd.DataFrame(columns=["opportunity_id", "code", "detail"])
+    return pd.DataFrame({
+        "opportunity_id": np.concatenate(ids_parts),
+        "code": np.concatenate(code_parts),
+        "detail": np.concatenate(detail_parts),
+    })
@@ -1,91 +1,167 @@
 
 from __future__ import annotations
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from .utils import (
-    parse_dt, normalize_phone, hash_email, closest_prior_or_same_rate, safe_float,
+    parse_dt_series, normalize_phone_series, hash_email_series,
     REQUIRED_OPP_COLS, REQUIRED_ACCT_COLS, enforce_required
 )
 
-def load_csv(path: str, parse_dates=None) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str, keep_default_na=False)
-    if parse_dates:
-        for c in parse_dates:
-            if c in df.columns:
-                df[c] = df[c].apply(parse_dt)
+TRUTHY = np.array(["true", "1", "t", "y"])
+STAGE_MAP_RENAME = {"source_stage": "StageName", "std_stage": "StageStd"}
+ACCOUNT_RENAME = {"Id": "AccountId", "Name": "AccountName", "Industry": "AccountIndustry"}
+ACCOUNT_JOIN_COLS = ["AccountId", "AccountName", "AccountIndustry", "OwnerId"]
+CANONICAL_COLS = [
+    "Id","AccountId","AccountName","AccountIndustry","Name",
+    "StageName","StageStd",
+    "Amount","CurrencyIsoCode","AmountUSD","expected_revenue_usd","Probability",
+    "CloseDate","CreatedDate","LastModifiedDate","sales_cycle_days",
+    "owner_email_hash","phone_normalized","is_won","is_lost"
+]
+
+def load_frame(path: str, parse_dates=None, numeric=None) -> pd.DataFrame:
+    """Read one pipeline input from a path or an open file-like object (e.g.
+    io.BytesIO, for producers that want to skip disk entirely). CSVs are parsed
+    with a typed schema: listed numeric columns land as float64 on the first
+    parse; everything else stays string so IDs keep leading zeros and empties
+    stay empty. Feather/Parquet paths keep their stored dtypes and skip CSV
+    tokenization entirely."""
+    suffix = str(path).lower()
+    if suffix.endswith(".feather"):
+        df = pd.read_feather(path)
+    elif suffix.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        schema = defaultdict(lambda: str)
+        na_values = {}
+        for c in numeric or []:
+            schema[c] = "float64"
+            na_values[c] = [""]
+        df = pd.read_csv(path, dtype=schema, keep_default_na=False, na_values=na_values or None)
+    return _parse_date_cols(df, parse_dates)
+
+def _parse_date_cols(df: pd.DataFrame, parse_dates) -> pd.DataFrame:
+    for c in parse_dates or []:
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = parse_dt_series(df[c])
     return df
 
+def _as_frame(source, parse_dates=None, numeric=None) -> pd.DataFrame:
+    """In-process handoff: accept a DataFrame directly (copied, so the caller's
+    frame survives the in-place transform stages) or load from a path."""
+    if isinstance(source, pd.DataFrame):
+        return _parse_date_cols(source.copy(), parse_dates)
+    return load_frame(source, parse_dates, numeric)
+
 def dedupe_latest(df: pd.DataFrame, id_col="Id", ts_col="LastModifiedDate") -> pd.DataFrame:
-    df = df.copy()
-    df[ts_col] = df[ts_col].apply(parse_dt)
+    """Mutates df's timestamp column in place; run_pipeline owns the frame."""
+    df[ts_col] = parse_dt_series(df[ts_col])
     df = df.sort_values(ts_col).drop_duplicates(subset=[id_col], keep="last")
     return df
 
+def _shared_category(a: pd.Series, b: pd.Series) -> pd.CategoricalDtype:
+    """Shared categorical dtype so merges join on integer codes, not string hashes."""
+    values = pd.unique(pd.concat([a, b], ignore_index=True))
+    return pd.CategoricalDtype(values[pd.notna(values)])
+
 def normalize_stages(opp: pd.DataFrame, stage_map: pd.DataFrame) -> pd.DataFrame:
-    stage_map = stage_map.rename(columns={"source_stage":"StageName","std_stage":"StageStd"})
+    stage_map = stage_map.rename(columns=STAGE_MAP_RENAME)
+    key = _shared_category(opp["StageName"], stage_map["StageName"])
+    opp["StageName"] = opp["StageName"].astype(key)
+    stage_map["StageName"] = stage_map["StageName"].astype(key)
     return opp.merge(stage_map[["StageName","StageStd"]], on="StageName", how="left")
 
 def enrich_accounts(opp: pd.DataFrame, accts: pd.DataFrame) -> pd.DataFrame:
-    accts = accts.rename(columns={"Id":"AccountId","Name":"AccountName","Industry":"AccountIndustry"})
-    cols = ["AccountId","AccountName","AccountIndustry","OwnerId"]
-    return opp.merge(accts[cols], on="AccountId", how="left")
+    accts = accts.rename(columns=ACCOUNT_RENAME)
+    key = _shared_category(opp["AccountId"], accts["AccountId"])
+    opp["AccountId"] = opp["AccountId"].astype(key)
+    accts["AccountId"] = accts["AccountId"].astype(key)
+    return opp.merge(accts[ACCOUNT_JOIN_COLS], on="AccountId", how="left")
 
 def apply_fx(opp: pd.DataFrame, fx: pd.DataFrame) -> pd.DataFrame:
-    fx = fx.copy()
+    """Mutates opp (and normalizes fx) in place; run_pipeline owns both frames."""
     fx["currency"] = fx["currency"].str.upper()
     fx["rate_date"] = pd.to_datetime(fx["rate_date"])
-    def _fx(row):
-        return closest_prior_or_same_rate(fx, row.get("CurrencyIsoCode"), row.get("CloseDate"))
-    opp["fx_rate_used"] = opp.apply(_fx, axis=1)
-    def to_usd(amount, rate):
-        if pd.isna(amount):
-            return None
-        if rate is None or pd.isna(rate):
-            return None
-        return float(amount) * float(rate)
-    opp["AmountUSD"] = opp.apply(lambda r: to_usd(r.get("Amount"), r.get("fx_rate_used")) if r.get("CurrencyIsoCode","").upper()!="USD" else safe_float(r.get("Amount")), axis=1)
+    fx["rate_to_usd"] = fx["rate_to_usd"].astype(float)
+    fx = fx.sort_values("rate_date")
+
+    cur = opp["CurrencyIsoCode"].fillna("").str.upper()
+    left = pd.DataFrame({"currency": cur, "CloseDate": opp["CloseDate"]})
+    dated = left["CloseDate"].notna()
+
+    # Single asof join: closest prior-or-same rate per currency.
+    matched = pd.merge_asof(
+        left[dated].sort_values("CloseDate").reset_index(),
+        fx,
+        left_on="CloseDate",
+        right_on="rate_date",
+        by="currency",
+        direction="backward",
+    ).set_index("index")
+
+    rates = pd.Series(np.nan, index=opp.index, dtype=float)
+    rates.loc[matched.index] = matched["rate_to_usd"]
+
+    # Fallback: latest available rate when no prior/same-day rate exists.
+    latest = fx.drop_duplicates("currency", keep="last").set_index("currency")["rate_to_usd"]
+    unmatched = dated & rates.isna()
+    rates.loc[unmatched] = cur[unmatched].map(latest)
+
+    opp["fx_rate_used"] = rates
+    amount = pd.to_numeric(opp["Amount"], errors="coerce")
+    opp["AmountUSD"] = np.where(cur.eq("USD"), amount, amount * rates)
     return opp
 
+def _truthy(series: pd.Series) -> np.ndarray:
+    return np.isin(series.astype(str).str.lower().to_numpy(dtype=object), TRUTHY)
+
 def compute_metrics(opp: pd.DataFrame) -> pd.DataFrame:
-    opp = opp.copy()
+    """Mutates opp in place; run_pipeline owns the frame."""
     # Types
     for col in ["Amount","Probability"]:
-        opp[col] = opp[col].apply(safe_float)
+        opp[col] = pd.to_numeric(opp[col], errors="coerce")
     for c in ["CloseDate","CreatedDate","LastModifiedDate"]:
         if c in opp.columns:
-            opp[c] = opp[c].apply(parse_dt)
+            opp[c] = pd.to_datetime(opp[c], errors="coerce")
 
-    opp["expected_revenue_usd"] = opp.apply(lambda r: (r.get("AmountUSD") or 0.0) * ((r.get("Probability") or 0.0)/100.0), axis=1)
+    opp["expected_revenue_usd"] = opp["AmountUSD"].fillna(0.0) * opp["Probability"].fillna(0.0) / 100.0
     opp["sales_cycle_days"] = (opp["CloseDate"] - opp["CreatedDate"]).dt.days
     # flags
-    opp["is_won"] = opp["IsWon"].astype(str).str.lower().isin(["true","1","t","y"]).astype(int)
-    opp["is_lost"] = opp.apply(lambda r: 1 if (str(r.get("IsClosed")).lower() in ["true","1","t","y"]) and (r.get("is_won")==0) else 0, axis=1)
+    won = _truthy(opp["IsWon"])
+    closed = _truthy(opp["IsClosed"])
+    opp["is_won"] = won.astype("int8")
+    opp["is_lost"] = (closed & ~won).astype("int8")
     return opp
 
 def sanitize_pii(opp: pd.DataFrame) -> pd.DataFrame:
-    opp = opp.copy()
-    opp["owner_email_hash"] = opp["OwnerEmail"].apply(hash_email)
-    opp["phone_normalized"] = opp["Phone"].apply(normalize_phone)
+    """Mutates opp in place; run_pipeline owns the frame."""
+    opp["owner_email_hash"] = hash_email_series(opp["OwnerEmail"])
+    opp["phone_normalized"] = normalize_phone_series(opp["Phone"])
     return opp
 
 def canonical_select(opp: pd.DataFrame) -> pd.DataFrame:
-    cols = [
-        "Id","AccountId","AccountName","AccountIndustry","Name",
-        "StageName","StageStd",
-        "Amount","CurrencyIsoCode","AmountUSD","expected_revenue_usd","Probability",
-        "CloseDate","CreatedDate","LastModifiedDate","sales_cycle_days",
-        "owner_email_hash","phone_normalized","is_won","is_lost"
-    ]
-    existing = [c for c in cols if c in opp.columns]
-    out = opp[existing].copy()
-    out = out.sort_values(["CloseDate","Id"], na_position="last").reset_index(drop=True)
-    return out
-
-def run_pipeline(opportunities_csv, accounts_csv, fx_csv, stage_map_csv):
-    # Load
-    opp = load_csv(opportunities_csv, parse_dates=["CloseDate","CreatedDate","LastModifiedDate"])
-    accts = load_csv(accounts_csv)
-    fx = load_csv(fx_csv, parse_dates=["rate_date"])
-    stage_map = load_csv(stage_map_csv)
+    existing = [c for c in CANONICAL_COLS if c in opp.columns]
+    # Order by (CloseDate, Id) with NaT last, via one lexsort on typed arrays
+    close = opp["CloseDate"].to_numpy(dtype="datetime64[ns]").view("int64")
+    close = np.where(close == np.iinfo(np.int64).min, np.iinfo(np.int64).max, close)
+    ids = opp["Id"].to_numpy(dtype=object)
+    order = np.lexsort((ids, close))
+    return opp.iloc[order].reset_index(drop=True)[existing]
+
+def run_pipeline(opportunities, accounts, fx_rates, stage_mapping):
+    """Each input may be a CSV/Feather/Parquet path or an in-process DataFrame."""
+    # Load the four inputs concurrently; they are independent IO
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        opp_fut = ex.submit(_as_frame, opportunities, ["CloseDate","CreatedDate","LastModifiedDate"], ["Amount","Probability"])
+        accts_fut = ex.submit(_as_frame, accounts)
+        fx_fut = ex.submit(_as_frame, fx_rates, ["rate_date"], ["rate_to_usd"])
+        stage_fut = ex.submit(_as_frame, stage_mapping)
+        opp = opp_fut.result()
+        accts = accts_fut.result()
+        fx = fx_fut.result()
+        stage_map = stage_fut.result()
 
     # Validate columns
     missing_opp = enforce_required(opp, REQUIRED_OPP_COLS)
@@ -2,11 +2,12 @@
 from __future__ import annotations
 from datetime import datetime, timedelta
 from dateutil import parser
+import numpy as np
 import pandas as pd
-import re
 import hashlib
 
 def parse_dt(x):
+    """Scalar fallback; use parse_dt_series for whole columns."""
     if pd.isna(x) or x == "":
         return pd.NaT
     try:
@@ -14,10 +15,25 @@ def parse_dt(x):
     except Exception:
         return pd.NaT
 
+def parse_dt_series(s: pd.Series) -> pd.Series:
+    """Vectorized parse_dt: strict ISO-8601 fast path; columns containing any
+    non-ISO value fall back to a coercing mixed-format parse."""
+    try:
+        return pd.to_datetime(s, format="ISO8601")
+    except (ValueError, TypeError):
+        return pd.to_datetime(s, errors="coerce", format="mixed")
+
+class _KeepDigits(dict):
+    """str.translate table: keeps ASCII digits, deletes everything else."""
+    def __missing__(self, key):
+        return None
+
+_KEEP_DIGITS = _KeepDigits({ord(c): c for c in "0123456789"})
+
 def normalize_phone(phone: str) -> str | None:
     if phone is None or str(phone).strip() == "":
         return None
-    digits = re.sub(r"\D+", "", str(phone))
+    digits = str(phone).translate(_KEEP_DIGITS)
     if digits.startswith("1") and len(digits) == 11:
         digits = digits[1:]
     if len(digits) == 10:
@@ -30,24 +46,58 @@ def normalize_phone(phone: str) -> str | None:
         return "+" + digits
     return "+" + digits if len(digits) >= 11 else None
 
+def normalize_phone_series(phones: pd.Series) -> pd.Series:
+    """Vectorized normalize_phone: one pass of string ops over the whole column."""
+    digits = phones.fillna("").astype(str).str.translate(_KEEP_DIGITS)
+    digits = digits.mask(digits.str.startswith("1") & (digits.str.len() == 11), digits.str[1:])
+    n = digits.str.len()
+    intl = n >= 11
+    normalized = np.select(
+        [n == 10, intl & digits.str.startswith("00"), intl & digits.str.startswith("011"), intl],
+        ["+1" + digits, "+" + digits.str[2:], "+" + digits.str[3:], "+" + digits],
+        default=None,
+    )
+    return pd.Series(normalized, index=phones.index, dtype=object)
+
 def hash_email(email: str) -> str | None:
     if email is None or str(email).strip() == "":
         return None
     return hashlib.sha256(str(email).lower().encode("utf-8")).hexdigest()
 
-def closest_prior_or_same_rate(fx_df: pd.DataFrame, currency: str, asof_date: pd.Timestamp):
+def hash_email_series(emails: pd.Series) -> pd.Series:
+    """Vectorized hash_email: lowercase once, hash each distinct address once."""
+    lowered = emails.fillna("").astype(str).str.lower()
+    blank = lowered.str.strip() == ""
+    sha256 = hashlib.sha256
+    digests = {e: sha256(e.encode("utf-8")).hexdigest() for e in pd.unique(lowered[~blank].to_numpy())}
+    hashed = lowered.map(digests).astype(object)
+    hashed[blank] = None
+    return hashed
+
+def build_fx_index(fx_df: pd.DataFrame) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Restructure FX rates into {currency: (sorted_dates, rates)} built once,
+    so each lookup is a single binary search instead of a filter + sort."""
+    index = {}
+    for cur, grp in fx_df.groupby(fx_df["currency"].str.upper()):
+        grp = grp.sort_values("rate_date")
+        index[cur] = (
+            pd.to_datetime(grp["rate_date"]).to_numpy(dtype="datetime64[ns]"),
+            grp["rate_to_usd"].to_numpy(dtype=float),
+        )
+    return index
+
+def closest_prior_or_same_rate(fx_index: dict, currency: str, asof_date: pd.Timestamp):
     if pd.isna(asof_date) or currency is None or currency == "":
         return None
-    cur = currency.upper()
-    sub = fx_df[fx_df["currency"] == cur]
-    if sub.empty:
+    entry = fx_index.get(str(currency).upper())
+    if entry is None:
         return None
-    sub = sub[sub["rate_date"] <= asof_date].sort_values("rate_date", ascending=False)
-    if not sub.empty:
-        return float(sub.iloc[0]["rate_to_usd"])
+    dates, rates = entry
+    i = np.searchsorted(dates, np.datetime64(asof_date, "ns"), side="right") - 1
+    if i >= 0:
+        return float(rates[i])
     # fallback: latest available
-    sub = fx_df[fx_df["currency"] == cur].sort_values("rate_date", ascending=False)
-    return float(sub.iloc[0]["rate_to_usd"]) if not sub.empty else None
+    return float(rates[-1])
 
 def safe_float(x):
     try:
@@ -1,7 +1,7 @@
 
 import pandas as pd
 from pathlib import Path
-from src.devin_etl.transformations import run_pipeline
+from src.transformations import run_pipeline
 
 def test_basic_transform(tmp_path: Path):
     root = Path(__file__).parent